@@ -0,0 +1,170 @@
+"""Blank-line reformatter for the project's Python sources.
+
+Normalises blank lines across `scripts/` and `ui/`: collapses stray
+blank runs inside code blocks, enforces the standard spacing before
+definitions, and trims long blank runs at top level.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+CACHE_NAME = ".reformat_cache.json"
+
+SOURCE_DIRS = ("scripts", "ui")
+
+
+def _walk(root):
+    """Yield .py paths below `root` via scandir, cheapest traversal."""
+    for entry in os.scandir(root):
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk(entry.path)
+        elif entry.name.endswith(".py"):
+            yield entry.path
+
+
+def collect_python_files(repo_root):
+    """Return every .py file under the source directories."""
+    files = []
+    root = Path(repo_root)
+    for dir_name in SOURCE_DIRS:
+        source_dir = root / dir_name
+        if source_dir.is_dir():
+            files.extend(Path(p) for p in sorted(_walk(source_dir)))
+    return files
+
+
+def reformat_content(text):
+    """Apply every blank-line rule to one file's content.
+
+    One pass over the precomputed line metadata handles inner blank-run
+    collapsing and definition spacing together, so no intermediate line
+    lists are built between the rules.
+    """
+    lines = text.split("\n")
+    stripped = [line.strip() for line in lines]
+    indents = [
+        len(line) - len(line.lstrip(" \t")) if s else -1
+        for line, s in zip(lines, stripped)
+    ]
+    next_non_empty = [-1] * len(lines)
+    nxt = -1
+    for i in range(len(lines) - 1, -1, -1):
+        next_non_empty[i] = nxt
+        if stripped[i]:
+            nxt = i
+    out = []
+    prev_indent = 0
+    blank_run = 0
+    for i, line in enumerate(lines):
+        s = stripped[i]
+        if not s:
+            # Blanks before a definition or decorator (method spacing)
+            # are always legitimate; elsewhere inside an indented block
+            # a single separating blank stays and longer runs collapse
+            # to it. Top-level runs collapse to two.
+            nxt = next_non_empty[i]
+            limit = 2
+            if (nxt != -1 and prev_indent > 0 and indents[nxt] > 0
+                    and not stripped[nxt].startswith(
+                        ("def ", "class ", "@"))):
+                limit = 1
+            blank_run += 1
+            if blank_run > limit:
+                continue
+            out.append(line)
+            continue
+        if (indents[i] == 0
+                and (s.startswith("def ") or s.startswith("class ")
+                     or s.startswith("@"))
+                and out and out[-1].strip()
+                # Decorators and leading comments bind to the
+                # definition below them; never wedge blanks in between.
+                and not out[-1].lstrip().startswith(("@", "#"))):
+            out.append("")
+            out.append("")
+        prev_indent = indents[i]
+        blank_run = 0
+        out.append(line)
+    return "\n".join(out)
+
+
+def _process_one(path):
+    """Reformat one file in place; module-level so workers can pickle it."""
+    original = path.read_text(encoding="utf-8")
+    reformatted = reformat_content(original)
+    if reformatted == original:
+        return path, False
+    path.write_text(reformatted, encoding="utf-8")
+    return path, True
+
+
+def _load_cache(repo_root):
+    try:
+        with open(Path(repo_root) / CACHE_NAME, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(repo_root, cache):
+    try:
+        with open(Path(repo_root) / CACHE_NAME, "w",
+                  encoding="utf-8") as fh:
+            json.dump(cache, fh)
+    except OSError:
+        pass
+
+
+def _cache_entry(path):
+    stat = path.stat()
+    return {
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "sha1": hashlib.sha1(path.read_bytes()).hexdigest(),
+    }
+
+
+def main():
+    repo_root = Path(__file__).parent
+    cache = _load_cache(repo_root)
+    all_files = collect_python_files(repo_root)
+    targets = []
+    for path in all_files:
+        entry = cache.get(str(path))
+        if entry:
+            # mtime+size is a cheap pre-check; only hash when it moved.
+            stat = path.stat()
+            if (entry["mtime"] == stat.st_mtime
+                    and entry["size"] == stat.st_size):
+                continue
+            if entry["sha1"] == hashlib.sha1(
+                    path.read_bytes()).hexdigest():
+                cache[str(path)] = _cache_entry(path)
+                continue
+        targets.append(path)
+    if len(targets) <= 2:
+        results = map(_process_one, targets)
+    else:
+        # Per-file reformatting is CPU-bound and independent; fan it
+        # out across cores.
+        executor = ProcessPoolExecutor()
+        results = executor.map(_process_one, targets)
+    changed = 0
+    for path, was_changed in results:
+        if was_changed:
+            changed += 1
+            print(f"Reformatted {path}")
+        cache[str(path)] = _cache_entry(path)
+    _save_cache(repo_root, cache)
+    print(
+        f"Checked {len(all_files)} files "
+        f"({len(all_files) - len(targets)} unchanged), "
+        f"reformatted {changed}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Storage layer for imported terminal commands.
+
+Holds the raw command texts (SY, PD, SE, ...) captured from the
+departure-control terminal so the UI pages can browse and edit them.
+"""
+
+import logging
+import sqlite3
+
+from scripts.hbpr_info_processor import find_database
+from scripts.home_metrics import _parse_cnf_from_text
+
+logger = logging.getLogger(__name__)
+
+
+class CommandProcessor:
+    """Create, update and query the imported-commands table."""
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file or find_database()
+        self._conn = None
+
+    def _get_conn(self):
+        """Return the cached connection, creating it on first use."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                self.db_file, check_same_thread=False
+            )
+            self._conn.executescript(
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA temp_store=MEMORY;"
+            )
+            self._conn.row_factory = sqlite3.Row
+            self.create_table()
+        return self._conn
+
+    def close(self):
+        """Close the cached connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def create_table(self):
+        """Create the commands table when it does not exist yet."""
+        conn = self._conn
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS commands (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                command_full TEXT UNIQUE NOT NULL,
+                flight_number TEXT,
+                flight_date TEXT,
+                command_type TEXT,
+                content TEXT,
+                is_latest INTEGER DEFAULT 1,
+                j_cnf INTEGER,
+                y_cnf INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        # Tables created before the capacity columns existed get them
+        # added here; CREATE TABLE IF NOT EXISTS will not.
+        cursor = conn.execute("PRAGMA table_info(commands)")
+        if not any(row[1] == "j_cnf" for row in cursor):
+            conn.execute("ALTER TABLE commands ADD COLUMN j_cnf INTEGER")
+            conn.execute("ALTER TABLE commands ADD COLUMN y_cnf INTEGER")
+        conn.commit()
+
+    def store_commands(self, commands):
+        """Insert or update parsed commands in one transaction.
+
+        `commands` is a list of (command_full, flight_number,
+        flight_date, command_type, content) tuples. A single
+        executemany upsert replaces per-row statements and per-row
+        commits, so hundreds of commands cost one SQL parse and one
+        fsync. SY capacities are parsed here at ingest -- and
+        recomputed on conflict -- so the home page never serves stale
+        CNF values. Returns (new_count, updated_count).
+        """
+        if not commands:
+            return 0, 0
+        conn = self._get_conn()
+        try:
+            rows = []
+            for (command_full, flight_number, flight_date,
+                 command_type, content) in commands:
+                j_cnf = y_cnf = None
+                if command_type == "SY":
+                    parsed = (_parse_cnf_from_text(command_full)
+                              or _parse_cnf_from_text(content))
+                    if parsed:
+                        j_cnf, y_cnf = parsed
+                rows.append((command_full, flight_number, flight_date,
+                             command_type, content, j_cnf, y_cnf))
+            cursor = conn.cursor()
+            existing = {
+                row[0] for row in cursor.execute(
+                    "SELECT command_full FROM commands"
+                )
+            }
+            new_count = sum(
+                1 for row in commands if row[0] not in existing
+            )
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany(
+                "INSERT INTO commands (command_full, flight_number, "
+                "flight_date, command_type, content, j_cnf, y_cnf) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(command_full) DO UPDATE SET "
+                "content = excluded.content, "
+                "j_cnf = excluded.j_cnf, "
+                "y_cnf = excluded.y_cnf, "
+                "updated_at = CURRENT_TIMESTAMP",
+                rows,
+            )
+            conn.commit()
+            return new_count, len(commands) - new_count
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.error("Error storing commands: %s", e)
+            return 0, 0
+
+    def get_all_commands_data(self):
+        """Return every stored command as a list of dicts."""
+        conn = self._get_conn()
+        cursor = conn.execute(
+            "SELECT command_full, flight_number, flight_date, "
+            "command_type, content, is_latest, created_at, updated_at "
+            "FROM commands ORDER BY updated_at DESC, id DESC"
+        )
+        return [dict(row) for row in cursor]
+
+    def get_commands_by_types(self, types):
+        """Return only the commands of the given types, newest first.
+
+        Filtering in SQL keeps unselected rows from ever crossing the
+        sqlite3 boundary, which is most of the cost when a large
+        history is viewed a few types at a time.
+        """
+        if not types:
+            return []
+        placeholders = ",".join("?" * len(types))
+        conn = self._get_conn()
+        cursor = conn.execute(
+            "SELECT command_full, flight_number, flight_date, "
+            "command_type, content, is_latest, created_at, updated_at "
+            f"FROM commands WHERE command_type IN ({placeholders}) "
+            "ORDER BY updated_at DESC, id DESC",
+            list(types),
+        )
+        return [dict(row) for row in cursor]
+
+    def get_command_types(self):
+        """Return the distinct command types in storage."""
+        conn = self._get_conn()
+        cursor = conn.execute(
+            "SELECT command_type FROM commands "
+            "GROUP BY command_type ORDER BY command_type"
+        )
+        return [row[0] for row in cursor]
+
+    def save_edited_data(self, command_full, content):
+        """Persist an edited command body.
+
+        Runs on the cached WAL connection, so sequential edits reuse
+        one prepared setup and commit with a relaxed-sync WAL append
+        instead of paying a fresh open plus a full-journal fsync each.
+        """
+        try:
+            conn = self._get_conn()
+            with conn:
+                # NULLing the capacities makes the read-side backfill
+                # re-parse the edited body on the next home render.
+                conn.execute(
+                    "UPDATE commands SET content = ?, "
+                    "j_cnf = NULL, y_cnf = NULL, "
+                    "updated_at = CURRENT_TIMESTAMP "
+                    "WHERE command_full = ?",
+                    (content, command_full),
+                )
+            return True
+        except sqlite3.Error as e:
+            logger.error("Error saving edited command: %s", e)
+            return False
+
+    def clear_all_commands(self):
+        """Delete every stored command."""
+        try:
+            conn = self._get_conn()
+            with conn:
+                conn.execute("DELETE FROM commands")
+            return True
+        except sqlite3.Error as e:
+            logger.error("Error clearing commands: %s", e)
+            return False
@@ -0,0 +1,60 @@
+"""EMD (excess-baggage receipt) record handling.
+
+Validates the records collected from the EMD entry page and shapes
+them into the payload posted to the settlement API.
+"""
+
+# Fields that must be present and non-empty on every record.
+REQUIRED_FIELDS = ("emd", "name", "flight_number", "flight_date", "ax")
+
+
+def validate_emd_record(record):
+    """Return a list of validation errors for one EMD record.
+
+    An empty list means the record is acceptable.
+    """
+    errors = []
+    for field in REQUIRED_FIELDS:
+        if not str(record.get(field, "")).strip():
+            errors.append(f"缺少必填字段: {field}")
+    emd = str(record.get("emd", "")).strip()
+    if emd and not (emd.isdigit() and len(emd) == 13):
+        errors.append("EMD票号必须是13位数字")
+    try:
+        amount = float(record.get("ax") or 0)
+    except (TypeError, ValueError):
+        errors.append("金额必须是数字")
+    else:
+        if amount < 0:
+            errors.append("金额不能为负数")
+    if str(record.get("payment", "")).strip().upper() == "CC":
+        last_4 = str(record.get("last_4_digit", "")).strip()
+        if not (last_4.isdigit() and len(last_4) == 4):
+            errors.append("刷卡支付必须提供卡号后四位")
+    return errors
+
+
+def convert_record(record):
+    """Normalise one record into the shape the API expects."""
+    converted = dict(record)
+    converted["emd"] = str(record.get("emd", "")).strip()
+    converted["name"] = str(record.get("name", "")).strip().upper()
+    converted["ax"] = round(float(record.get("ax") or 0), 2)
+    converted["bag_pieces"] = int(record.get("bag_pieces") or 0)
+    converted["bag_weight"] = int(record.get("bag_weight") or 0)
+    converted["last_4_digit"] = str(
+        record.get("last_4_digit", "")
+    ).strip()
+    return converted
+
+
+def create_api_data(records, total_amount, report_date, signature,
+                    collection_msg):
+    """Build the settlement payload from validated records."""
+    return {
+        "report_date": report_date,
+        "signature": signature,
+        "collection_msg": collection_msg,
+        "total_amount": round(float(total_amount or 0), 2),
+        "emd_list": [convert_record(record) for record in records],
+    }
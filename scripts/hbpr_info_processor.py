@@ -0,0 +1,421 @@
+"""HBPR record parser.
+
+Parses a single HBPR text record (one passenger) into structured fields used
+by the database layer. `find_database` locates the working SQLite database
+that contains the `hbpr_full_records` table.
+"""
+
+import functools
+import glob
+import os
+import re
+import sqlite3
+
+
+# Pre-compiled patterns for the hot parsing paths.
+_PAT_HBNB = re.compile(r">HBPR:\s*[^,]+,(\d+)", re.ASCII)
+_PAT_FLIGHT = re.compile(r">HBPR:\s*([^*,]+)", re.ASCII)
+_PAT_BN = re.compile(r"\bBN(\d{1,3})\b", re.ASCII)
+_PAT_PNR = re.compile(r"\bPNR:\s*([A-Z0-9]{5,6})\b", re.ASCII)
+_PAT_NAME = re.compile(r"^\s*BN\d{1,3}\s+([A-Z/ ]+?)\s{2,}", re.MULTILINE | re.ASCII)
+_PAT_SEAT = re.compile(r"\b(\d{1,2}[A-L])\b", re.ASCII)
+_PAT_CLASS = re.compile(r"\s([A-Z])\s+[A-Z]{3}-[A-Z]{3}", re.ASCII)
+_PAT_DEST = re.compile(r"\b[A-Z]{3}-([A-Z]{3})\b", re.ASCII)
+_PAT_BAG = re.compile(r"BAG(\d{1,2})/(\d{1,3})/\d+\s", re.ASCII)
+_PC_PAT = re.compile(r"/PDBG/(\d+)PC", re.ASCII)
+_PAT_FF = re.compile(r"\bFF\s+([A-Z]{2})(\d+)(?:/([A-Z]))?", re.ASCII)
+_PAT_EXBG = re.compile(r"EXBG/(\d{1,2})PC", re.ASCII)
+_PAT_INBOUND = re.compile(r"\bIN:\s*([A-Z]{2}\d{3,4}/\d{2}[A-Z]{3})", re.ASCII)
+_PAT_OUTBOUND = re.compile(r"\bOUT:\s*([A-Z]{2}\d{3,4}/\d{2}[A-Z]{3})", re.ASCII)
+
+# All repeating statements folded into one alternation so a record is
+# walked once; dispatch is on the innermost named group that matched.
+_MASTER_PAT = re.compile(
+    r"CKIN\s+(?P<ckin_body>[^\n]+)"
+    r"|(?P<asvc>ASVC-[^\n]*)"
+    r"|/(?P<expc_kg>\d{1,2})KG-"
+    r"|\bFBA-(?P<fba_pc>\d{1,2})PC\b"
+    r"|\bIFBA-(?P<ifba_pc>\d{1,2})PC\b"
+    r"|(?P<prop>\b(?:SA|XRES|INAD|VIP|UM|WCHR)\b)"
+    r"|(?P<inf>\bINF\b)",
+    re.ASCII,
+)
+
+
+class CArgs:
+    """Static lookup tables shared by the parser."""
+
+    __SUB_TO_MAIN = {
+        "F": "F", "A": "F",
+        "J": "C", "C": "C", "D": "C", "Z": "C", "R": "C",
+        "W": "Y", "E": "Y",
+        "Y": "Y", "B": "Y", "M": "Y", "H": "Y", "K": "Y", "L": "Y",
+        "Q": "Y", "G": "Y", "V": "Y", "S": "Y", "N": "Y", "T": "Y",
+        "U": "Y", "X": "Y", "O": "Y", "P": "Y", "I": "Y",
+    }
+
+    __CLASS_BAG_WEIGHT = {"F": 32, "C": 32, "Y": 23}
+
+    def SubCls2MainCls(self, sub_class):
+        """Map a booking sub-class letter to its main cabin class."""
+        return self.__SUB_TO_MAIN.get(sub_class, "Y")
+
+    def ClassBagWeight(self, main_class):
+        """Free baggage weight (kg per piece) for a main cabin class."""
+        return self.__CLASS_BAG_WEIGHT.get(main_class, 23)
+
+
+_ARGS = CArgs()
+
+
+@functools.lru_cache(maxsize=64)
+def _sub2main(sub_class):
+    return _ARGS.SubCls2MainCls(sub_class)
+
+
+@functools.lru_cache(maxsize=64)
+def _class_bag_weight(main_class):
+    return _ARGS.ClassBagWeight(main_class)
+
+
+@functools.lru_cache(maxsize=4)
+def _probe_for_hbpr(db_path: str, mtime: float) -> bool:
+    """Return True when `db_path` contains the `hbpr_full_records` table.
+
+    Keyed on (path, mtime) so a rebuilt database is re-probed while repeat
+    lookups of an unchanged file skip the connect entirely. The probe opens
+    the file read-only so no journal files are created.
+    """
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type='table' AND name='hbpr_full_records'"
+            )
+            return cursor.fetchone() is not None
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return False
+
+
+def find_database(db_dir="databases"):
+    """Locate the SQLite database holding HBPR full records.
+
+    Returns the path of the first `.db` file under `db_dir` that contains
+    the `hbpr_full_records` table, or None when no candidate matches.
+    """
+    db_files = sorted(glob.glob(os.path.join(db_dir, "*.db")))
+    for db_file in db_files:
+        try:
+            mtime = os.path.getmtime(db_file)
+        except OSError:
+            continue
+        if _probe_for_hbpr(db_file, mtime):
+            return db_file
+    return None
+
+
+class CHbpr:
+    """Parses one HBPR record into validated passenger fields."""
+
+    ERROR_NUMBER = -1
+
+    __slots__ = (
+        "error_msg", "debug_msg", "BoardingNumber", "HbnbNumber", "PNR",
+        "NAME", "SEAT", "CLASS", "DESTINATION", "BAG_PIECE", "BAG_WEIGHT",
+        "BAG_ALLOWANCE", "FF", "PSPT_NAME", "PSPT_EXP_DATE", "CKIN_MSG",
+        "ASVC_MSG", "CKIN_EXBG", "EXPC_PIECE", "EXPC_WEIGHT", "ASVC_PIECE",
+        "FBA_PIECE", "IFBA_PIECE", "FLYER_BENEFIT", "INBOUND_FLIGHT",
+        "OUTBOUND_FLIGHT", "PROPERTIES", "IS_CA_FLYER", "HAS_INFANT",
+        "_pspt_fields", "_CHbpr__Hbpr", "_CHbpr__ChkBagAverageWeight",
+    )
+
+    def __init__(self) -> None:
+        self.BoardingNumber: int = 0
+        self.HbnbNumber: int = 0
+        self.PNR: str = ""
+        self.NAME: str = ""
+        self.SEAT: str = ""
+        self.CLASS: str = ""
+        self.DESTINATION: str = ""
+        self.BAG_PIECE: int = 0
+        self.BAG_WEIGHT: int = 0
+        self.BAG_ALLOWANCE: int = 0
+        self.FF: str = ""
+        self.PSPT_NAME: str = ""
+        self.PSPT_EXP_DATE: str = ""
+        self.CKIN_EXBG: int = 0
+        self.EXPC_PIECE: int = 0
+        self.EXPC_WEIGHT: int = 0
+        self.ASVC_PIECE: int = 0
+        self.FBA_PIECE: int = 0
+        self.IFBA_PIECE: int = 0
+        self.FLYER_BENEFIT: int = 0
+        self.INBOUND_FLIGHT: str = ""
+        self.OUTBOUND_FLIGHT: str = ""
+        self.IS_CA_FLYER: bool = False
+        self.HAS_INFANT: int = 0
+        self.error_msg: dict[str, list[str]] = {
+            "Name": [],
+            "Baggage": [],
+            "Passport": [],
+            "Visa": [],
+            "General": [],
+        }
+        self.debug_msg: list[str] = []
+        self.CKIN_MSG: list[str] = []
+        self.ASVC_MSG: list[str] = []
+        self.PROPERTIES: list[str] = []
+        self._pspt_fields: list[str] | None = None
+        self.__Hbpr: str = ""
+        self.__ChkBagAverageWeight: float = 0.0
+
+    def run(self, hbpr_text: str) -> None:
+        """Parse `hbpr_text` and populate every structured field."""
+        self.__Hbpr = hbpr_text
+        try:
+            self.__ExtractStructuredData()
+        except Exception as e:
+            self.error_msg["General"].append(f"Parse failure: {e}")
+
+    def is_valid(self) -> bool:
+        """True when no validation bucket collected an error."""
+        return not any(self.error_msg.values())
+
+    def __ExtractStructuredData(self) -> None:
+        self.__GetHbnbNumber()
+        self.__GetPassengerInfo()
+        self.__GetChkBag()
+        self.__ParsePassport()
+        self.__GetPassportExp()
+        self.__GetVisaInfo()
+        self.__GetFlyerInfo()
+        self.__ScanStatements()
+        self.__GetFlights()
+        self.__CalculateBagPieceAndWeight()
+        self.__MatchingBag()
+
+    def __GetHbnbNumber(self) -> None:
+        hbnbMatch = _PAT_HBNB.search(self.__Hbpr)
+        if hbnbMatch:
+            g = hbnbMatch.group(1)
+            self.HbnbNumber = int(g) if g.isdigit() else self.ERROR_NUMBER
+        else:
+            self.HbnbNumber = self.ERROR_NUMBER
+            self.error_msg["General"].append("HBNB number not found")
+
+    def __GetPassengerInfo(self) -> None:
+        bnMatch = _PAT_BN.search(self.__Hbpr)
+        if bnMatch:
+            g = bnMatch.group(1)
+            self.BoardingNumber = int(g) if g.isdigit() else 0
+        pnrMatch = _PAT_PNR.search(self.__Hbpr)
+        if pnrMatch:
+            self.PNR = pnrMatch.group(1)
+        nameMatch = _PAT_NAME.search(self.__Hbpr)
+        if nameMatch:
+            self.NAME = nameMatch.group(1).strip()
+        else:
+            self.error_msg["Name"].append("Passenger name not found")
+        seatMatch = _PAT_SEAT.search(self.__Hbpr)
+        if seatMatch:
+            self.SEAT = seatMatch.group(1)
+        classMatch = _PAT_CLASS.search(self.__Hbpr)
+        if classMatch:
+            self.CLASS = classMatch.group(1)
+        destMatch = _PAT_DEST.search(self.__Hbpr)
+        if destMatch:
+            self.DESTINATION = destMatch.group(1)
+
+    def __GetChkBag(self) -> None:
+        bagMatch = _PAT_BAG.search(self.__Hbpr)
+        if bagMatch:
+            piece, weight = bagMatch.group(1), bagMatch.group(2)
+            if piece.isdigit() and weight.isdigit():
+                self.BAG_PIECE = int(piece)
+                self.BAG_WEIGHT = int(weight)
+            else:
+                self.error_msg["Baggage"].append(
+                    f"Unreadable BAG statement: {bagMatch.group()}"
+                )
+            if self.BAG_PIECE > 0:
+                self.__ChkBagAverageWeight = self.BAG_WEIGHT / self.BAG_PIECE
+
+    def __ParsePassport(self) -> None:
+        """Slice and split the PASSPORT statement once for both consumers."""
+        idx = self.__Hbpr.find("PASSPORT :")
+        if idx == -1:
+            self._pspt_fields = None
+            return
+        end = self.__Hbpr.find(" ", idx + 10)
+        if end == -1:
+            end = len(self.__Hbpr)
+        self._pspt_fields = self.__Hbpr[idx + 10:end].split("/")
+
+    def __GetPassportExp(self) -> None:
+        lstPspt = self._pspt_fields
+        if lstPspt is None:
+            self.error_msg["Passport"].append("PASSPORT statement not found")
+            return
+        if len(lstPspt) > 5:
+            self.PSPT_EXP_DATE = lstPspt[5]
+        if len(lstPspt) > 1:
+            self.PSPT_NAME = "/".join(lstPspt[:2])
+        if self.PSPT_NAME and self.NAME:
+            self.__NameMatchMode1()
+
+    def __GetVisaInfo(self) -> None:
+        lstPspt = self._pspt_fields
+        if lstPspt is None:
+            return
+        if len(lstPspt) > 3:
+            nationality = lstPspt[3]
+            if nationality != "CN" and "VISA" not in self.__Hbpr:
+                self.error_msg["Visa"].append(
+                    f"Nationality {nationality} without visa record"
+                )
+
+    def __GetFlyerInfo(self) -> None:
+        ffMatch = _PAT_FF.search(self.__Hbpr)
+        if ffMatch:
+            self.FF = ffMatch.group(1) + ffMatch.group(2)
+            self.IS_CA_FLYER = ffMatch.group(1) == "CA"
+            tier = ffMatch.group(3)
+            if self.IS_CA_FLYER and tier in ("G", "S"):
+                self.FLYER_BENEFIT = 1
+
+    def __ScanStatements(self) -> None:
+        """Collect every repeating statement in one pass over the record.
+
+        CKIN, ASVC, EXPC, FBA/IFBA and property tokens used to be
+        independent full-record scans; the combined alternation walks the
+        text once and dispatches on the matched group.
+        """
+        result_piece = 0
+        w_total = 0
+        seen = set()
+        for m in _MASTER_PAT.finditer(self.__Hbpr):
+            kind = m.lastgroup
+            if kind == "ckin_body":
+                ckin_line = m.group("ckin_body").strip()
+                self.CKIN_MSG.append(ckin_line)
+                exbgMatch = _PAT_EXBG.search(ckin_line)
+                if exbgMatch:
+                    self.CKIN_EXBG += int(exbgMatch.group(1))
+            elif kind == "asvc":
+                asvc_line = m.group("asvc")
+                self.ASVC_MSG.append(asvc_line.strip())
+                result_piece += sum(
+                    int(n) for n in _PC_PAT.findall(asvc_line)
+                )
+            elif kind == "expc_kg":
+                w_total += int(m.group("expc_kg"))
+                self.EXPC_PIECE += 1
+            elif kind == "fba_pc":
+                self.FBA_PIECE = int(m.group("fba_pc"))
+            elif kind == "ifba_pc":
+                self.IFBA_PIECE = int(m.group("ifba_pc"))
+            elif kind == "prop":
+                prop = m.group("prop")
+                if prop not in seen:
+                    seen.add(prop)
+                    self.PROPERTIES.append(prop)
+            elif kind == "inf":
+                self.HAS_INFANT = 1
+        self.ASVC_PIECE = result_piece
+        self.EXPC_WEIGHT = w_total
+
+    def __GetFlights(self) -> None:
+        inMatch = _PAT_INBOUND.search(self.__Hbpr)
+        if inMatch:
+            self.INBOUND_FLIGHT = inMatch.group(1)
+        outMatch = _PAT_OUTBOUND.search(self.__Hbpr)
+        if outMatch:
+            self.OUTBOUND_FLIGHT = outMatch.group(1)
+
+    def __CalculateBagPieceAndWeight(self) -> None:
+        main_class = _sub2main(self.CLASS)
+        allowance_piece = self.FBA_PIECE if self.FBA_PIECE else (
+            2 if main_class in ("F", "C") else 1
+        )
+        allowance_piece += self.IFBA_PIECE
+        allowance_piece += self.ASVC_PIECE + self.CKIN_EXBG + self.EXPC_PIECE
+        if self.FLYER_BENEFIT:
+            allowance_piece += 1
+        self.BAG_ALLOWANCE = allowance_piece * _class_bag_weight(main_class)
+
+    def __MatchingBag(self) -> None:
+        if self.BAG_PIECE == 0:
+            return
+        main_class = _sub2main(self.CLASS)
+        per_piece = _class_bag_weight(main_class)
+        if self.__ChkBagAverageWeight > per_piece + self.EXPC_WEIGHT:
+            self.error_msg["Baggage"].append(
+                f"Average bag weight {self.__ChkBagAverageWeight:.1f}kg exceeds "
+                f"{per_piece}kg allowance for class {self.CLASS}"
+            )
+        if self.BAG_WEIGHT > self.BAG_ALLOWANCE + self.EXPC_WEIGHT:
+            self.error_msg["Baggage"].append(
+                f"Total bag weight {self.BAG_WEIGHT}kg exceeds allowance "
+                f"{self.BAG_ALLOWANCE}kg"
+            )
+
+    def __NameMatchMode1(self) -> None:
+        """Cross-check the boarding name against the passport name."""
+        lstShort = [t for t in re.split(r"[/ ]+", self.NAME) if t]
+        lstLong = [t for t in re.split(r"[/ ]+", self.PSPT_NAME) if t]
+        if len(lstLong) < len(lstShort):
+            lstShort, lstLong = lstLong, lstShort
+        shorts = tuple(lstShort)
+        countMatch = sum(1 for lo in lstLong for sh in shorts if sh in lo)
+        if countMatch <= 1:
+            self.error_msg["Name"].append(
+                f"Name mismatch: '{self.NAME}' vs passport '{self.PSPT_NAME}'"
+            )
+
+    def get_structured_data(self) -> dict:
+        """Return the parsed record as a flat dict for database storage."""
+        nonempty = [k for k, v in self.error_msg.items() if v]
+        return {
+            "hbnb_number": self.HbnbNumber,
+            "boarding_number": self.BoardingNumber,
+            "pnr": self.PNR,
+            "name": self.NAME,
+            "seat": self.SEAT,
+            "class": self.CLASS,
+            "destination": self.DESTINATION,
+            "bag_piece": self.BAG_PIECE,
+            "bag_weight": self.BAG_WEIGHT,
+            "bag_allowance": self.BAG_ALLOWANCE,
+            "ff": self.FF,
+            "pspt_name": self.PSPT_NAME,
+            "pspt_exp_date": self.PSPT_EXP_DATE,
+            "ckin_msg": "; ".join(self.CKIN_MSG),
+            "asvc_msg": "; ".join(self.ASVC_MSG),
+            "ckin_exbg": self.CKIN_EXBG,
+            "expc_piece": self.EXPC_PIECE,
+            "expc_weight": self.EXPC_WEIGHT,
+            "asvc_piece": self.ASVC_PIECE,
+            "fba_piece": self.FBA_PIECE,
+            "ifba_piece": self.IFBA_PIECE,
+            "flyer_benefit": self.FLYER_BENEFIT,
+            "inbound_flight": self.INBOUND_FLIGHT,
+            "outbound_flight": self.OUTBOUND_FLIGHT,
+            "properties": ",".join(self.PROPERTIES),
+            "is_sa": int("SA" in self.PROPERTIES),
+            "is_xres": int("XRES" in self.PROPERTIES),
+            "is_inad": int("INAD" in self.PROPERTIES),
+            "has_props": int(bool(self.PROPERTIES)),
+            "is_ca_flyer": int(self.IS_CA_FLYER),
+            "has_infant": self.HAS_INFANT,
+            "has_error": bool(nonempty),
+            "error_count": len(nonempty),
+            "error_details": "\n".join(
+                f"{bucket}: {'; '.join(self.error_msg[bucket])}"
+                for bucket in nonempty
+            ),
+            "debug_info": "\n".join(self.debug_msg),
+        }
@@ -0,0 +1,407 @@
+"""Parsers and duplicate-record helpers for raw HBPR list output.
+
+`HBPRProcessor` turns a pasted or saved HBPR command list into per-flight
+full/simple record sets and stores them into the flight database.
+`HbprInfoProcessor` answers the duplicate-record queries used by the
+records page.
+"""
+
+import logging
+import re
+import sqlite3
+from collections import defaultdict
+
+from scripts.hbpr_database import HbprDatabase
+from scripts.hbpr_info_processor import find_database
+
+logger = logging.getLogger(__name__)
+
+# One alternation classifies and captures each line in a single match:
+# `full` carries the flight/HBNB of a >HBPR: header, `simple` those of a
+# one-line hbpr command.
+_LINE_RE = re.compile(
+    r"\s*(?:>(?P<full>HBPR):\s*(?P<full_flight>[^*,]+)"
+    r",\s*(?P<full_hbnb>\d+)"
+    r"|(?P<simple>hbpr)\s*(?P<simple_flight>[^,]*)"
+    r",\s*(?P<simple_hbnb>\d+))",
+    re.IGNORECASE,
+)
+
+
+class HBPRProcessor:
+    """Parse raw HBPR text files into full/simple record sets."""
+
+    def __init__(self):
+        self.flight_data = defaultdict(
+            lambda: {
+                "full_records": defaultdict(list),
+                "simple_records": {},
+            }
+        )
+
+    def parse_file(self, file_path):
+        """Parse `file_path`, grouping records by flight.
+
+        The file is streamed line by line; full-record parsing hands
+        back the first line it did not consume, so memory stays at one
+        record instead of the whole file.
+        """
+        with open(file_path, "r", encoding="utf-8") as file:
+            lines_iter = iter(file)
+            line = next(lines_iter, None)
+            while line is not None:
+                match = _LINE_RE.match(line)
+                if match is None:
+                    line = next(lines_iter, None)
+                elif match.group("full"):
+                    line = self.parse_full_record(line, lines_iter, match)
+                else:
+                    self._parse_simple_record(line, match)
+                    line = next(lines_iter, None)
+        return self.flight_data
+
+    def parse_full_record(self, header, lines_iter, match=None):
+        """Consume one multi-line full record from `lines_iter`.
+
+        `header` is the >HBPR: line and `match` its `_LINE_RE` match when
+        the caller already has it. Returns the first unconsumed line, or
+        None at end of input.
+        """
+        if match is None:
+            match = _LINE_RE.match(header)
+        if match is None or not match.group("full"):
+            return next(lines_iter, None)
+        flight = match.group("full_flight").strip()
+        hbnb_num = int(match.group("full_hbnb"))
+        record_lines = [header.rstrip("\n")]
+        line = next(lines_iter, None)
+        while line is not None and not line.startswith(">"):
+            record_lines.append(line.rstrip("\n"))
+            line = next(lines_iter, None)
+        record_content = "\n".join(record_lines)
+        # Parts of records split across pages are joined once at store
+        # time instead of re-concatenating the string per part.
+        self.flight_data[flight]["full_records"][hbnb_num].append(
+            record_content
+        )
+        return line
+
+    def _parse_simple_record(self, line, match=None):
+        """Record one single-line hbpr command."""
+        if match is None:
+            match = _LINE_RE.match(line)
+        if match is None or not match.group("simple"):
+            return
+        flight = match.group("simple_flight").strip()
+        hbnb_num = int(match.group("simple_hbnb"))
+        self.flight_data[flight]["simple_records"][hbnb_num] = line.strip()
+
+    def _clean_duplicate_headers(self, content):
+        """Drop repeated >HBPR: headers and trailing page '+' markers."""
+        out = []
+        seen_header = False
+        for line in content.split("\n"):
+            if line.lstrip().startswith(">HBPR:"):
+                if seen_header:
+                    continue
+                seen_header = True
+                out.append(line)
+            else:
+                out.append(line.rstrip("+"))
+        return "\n".join(out)
+
+    @staticmethod
+    def _group_runs(numbers):
+        """Collapse a sorted number list into inclusive (start, end) runs."""
+        runs = []
+        start = prev = None
+        for n in numbers:
+            if prev is None:
+                start = prev = n
+            elif n == prev + 1:
+                prev = n
+            else:
+                runs.append((start, prev))
+                start = prev = n
+        if prev is not None:
+            runs.append((start, prev))
+        return runs
+
+    def find_missing_numbers(self, flight_data):
+        """Return the HBNB numbers absent from one flight's records."""
+        hbnb_numbers = set(flight_data["full_records"])
+        hbnb_numbers.update(flight_data["simple_records"])
+        if not hbnb_numbers:
+            return []
+        min_num = min(hbnb_numbers)
+        max_num = max(hbnb_numbers)
+        # Iterating the range keeps peak memory at O(missing) instead of
+        # materialising a second full-range set; output is already sorted.
+        return [
+            n for n in range(min_num, max_num + 1)
+            if n not in hbnb_numbers
+        ]
+
+    def store_records(self, flight, db_file):
+        """Store one flight's parsed records into `db_file`."""
+        flight_data = self.flight_data[flight]
+        database = HbprDatabase(db_file=db_file)
+        database.create_tables()
+        database.close()
+        conn = sqlite3.connect(db_file)
+        conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+            "PRAGMA temp_store=MEMORY;"
+        )
+        cursor = conn.cursor()
+        full_records = flight_data["full_records"]
+        full_rows = [
+            (hbnb_num, self._clean_duplicate_headers("\n".join(parts)))
+            for hbnb_num, parts in full_records.items()
+        ]
+        simple_rows = [
+            (hbnb_num, line)
+            for hbnb_num, line in flight_data["simple_records"].items()
+            if hbnb_num not in full_records
+        ]
+        missing = self.find_missing_numbers(flight_data)
+        with conn:
+            cursor.executemany(
+                "INSERT OR REPLACE INTO hbpr_full_records "
+                "(hbnb_number, record_content) VALUES (?, ?)",
+                full_rows,
+            )
+            cursor.executemany(
+                "INSERT OR REPLACE INTO hbpr_simple_records "
+                "(hbnb_number, record_line) VALUES (?, ?)",
+                simple_rows,
+            )
+            cursor.execute("DELETE FROM missing_numbers")
+            cursor.executemany(
+                "INSERT INTO missing_numbers (start_num, end_num) "
+                "VALUES (?, ?)",
+                self._group_runs(missing),
+            )
+        conn.close()
+        return len(full_rows) + len(simple_rows)
+
+
+class HbprInfoProcessor:
+    """Duplicate-record queries used by the records page."""
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file or find_database()
+        self._conn = None
+        self._has_duplicate_table = None
+
+    def _get_conn(self):
+        """Return the cached connection, creating it on first use."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                self.db_file, check_same_thread=False
+            )
+            self._conn.executescript(
+                "PRAGMA journal_mode=WAL;"
+                "PRAGMA synchronous=NORMAL;"
+                "PRAGMA temp_store=MEMORY;"
+                "PRAGMA cache_size=-64000;"
+            )
+        return self._conn
+
+    def close(self):
+        """Close the cached connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _duplicate_table_exists(self):
+        """True when duplicate_record exists; probed once per database."""
+        if self._has_duplicate_table is None:
+            cursor = self._get_conn().cursor()
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type='table' AND name='duplicate_record'"
+            )
+            self._has_duplicate_table = cursor.fetchone() is not None
+        return self._has_duplicate_table
+
+    def find_database(self, db_dir="databases"):
+        """Re-resolve the active database file."""
+        self.close()
+        self._has_duplicate_table = None
+        self.db_file = find_database(db_dir)
+        return self.db_file
+
+    def get_duplicate_records(self, hbnb_number):
+        """Return the archived duplicates for one HBNB number."""
+        if not self._duplicate_table_exists():
+            return []
+        cursor = self._get_conn().cursor()
+        cursor.execute(
+            "SELECT id, hbnb_number, record_content, created_at "
+            "FROM duplicate_record WHERE original_hbnb_id = ? "
+            "ORDER BY created_at",
+            (hbnb_number,),
+        )
+        return [
+            {
+                "id": row[0],
+                "hbnb_number": row[1],
+                "record_content": row[2],
+                "created_at": row[3],
+            }
+            for row in cursor.fetchall()
+        ]
+
+    def get_all_duplicate_hbnbs(self):
+        """Return every HBNB number that has archived duplicates."""
+        if not self._duplicate_table_exists():
+            return []
+        cursor = self._get_conn().cursor()
+        # GROUP BY walks idx_dup_original in order, so no DISTINCT
+        # materialisation or sort step is needed.
+        cursor.execute(
+            "SELECT original_hbnb_id FROM duplicate_record "
+            "GROUP BY original_hbnb_id"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def get_duplicate_record_content(self, duplicate_id):
+        """Return the stored content of one archived duplicate."""
+        cursor = self._get_conn().cursor()
+        cursor.execute(
+            "SELECT record_content FROM duplicate_record WHERE id = ?",
+            (duplicate_id,),
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def get_combined_records_for_display(self):
+        """Return full records with their duplicates interleaved.
+
+        One LEFT JOIN streams originals and duplicates together instead
+        of issuing a duplicate lookup per full record.
+        """
+        cursor = self._get_conn().cursor()
+        has_duplicates = self._duplicate_table_exists()
+        if has_duplicates:
+            # Most flights have no archived duplicates at all; one probe
+            # lets those skip the LEFT JOIN entirely.
+            cursor.execute(
+                "SELECT 1 FROM hbpr_full_records "
+                "WHERE bol_duplicate = 1 LIMIT 1"
+            )
+            has_duplicates = cursor.fetchone() is not None
+        combined = []
+        if not has_duplicates:
+            cursor.execute(
+                "SELECT hbnb_number, record_content, created_at "
+                "FROM hbpr_full_records ORDER BY hbnb_number"
+            )
+            for hbnb_number, content, created_at in cursor:
+                combined.append(
+                    {
+                        "type": "original",
+                        "hbnb_number": hbnb_number,
+                        "record_content": content,
+                        "created_at": created_at,
+                        "has_duplicates": False,
+                    }
+                )
+            return combined
+        cursor.execute(
+            "SELECT f.hbnb_number, f.record_content, f.created_at, "
+            "d.id, d.hbnb_number, d.record_content, d.created_at "
+            "FROM hbpr_full_records f "
+            "LEFT JOIN duplicate_record d "
+            "ON d.original_hbnb_id = f.hbnb_number "
+            "ORDER BY f.hbnb_number, d.created_at"
+        )
+        last_hbnb = None
+        for row in cursor:
+            hbnb_number = row[0]
+            if hbnb_number != last_hbnb:
+                combined.append(
+                    {
+                        "type": "original",
+                        "hbnb_number": hbnb_number,
+                        "record_content": row[1],
+                        "created_at": row[2],
+                        "has_duplicates": row[3] is not None,
+                    }
+                )
+                last_hbnb = hbnb_number
+            if row[3] is not None:
+                combined.append(
+                    {
+                        "type": "duplicate",
+                        "duplicate_id": row[3],
+                        "hbnb_number": row[4],
+                        "record_content": row[5],
+                        "created_at": row[6],
+                        "original_hbnb_id": hbnb_number,
+                    }
+                )
+        return combined
+
+    def create_duplicate_records_bulk(self, records):
+        """Archive many duplicates in one transaction.
+
+        `records` is a list of (original_hbnb_id, hbnb_number,
+        record_content, created_at) tuples; one commit covers the whole
+        batch instead of one per record.
+        """
+        if not records:
+            return 0
+        try:
+            database = HbprDatabase(db_file=self.db_file)
+            database.create_tables()
+            database.close()
+            self._has_duplicate_table = True
+            conn = self._get_conn()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO duplicate_record "
+                    "(original_hbnb_id, hbnb_number, record_content, "
+                    "created_at) VALUES (?, ?, ?, ?)",
+                    records,
+                )
+                conn.executemany(
+                    "UPDATE hbpr_full_records SET bol_duplicate = 1 "
+                    "WHERE hbnb_number = ?",
+                    ((record[0],) for record in records),
+                )
+            return len(records)
+        except sqlite3.Error as e:
+            logger.error("Error creating duplicate records: %s", e)
+            return 0
+
+    def create_duplicate_record_with_time(self, original_hbnb_id,
+                                          hbnb_number, record_content,
+                                          created_at):
+        """Archive one duplicate with an explicit timestamp."""
+        try:
+            database = HbprDatabase(db_file=self.db_file)
+            database.create_tables()
+            database.close()
+            self._has_duplicate_table = True
+            conn = self._get_conn()
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO duplicate_record "
+                "(original_hbnb_id, hbnb_number, record_content, "
+                "created_at) VALUES (?, ?, ?, ?)",
+                (original_hbnb_id, hbnb_number, record_content,
+                 created_at),
+            )
+            cursor.execute(
+                "UPDATE hbpr_full_records SET bol_duplicate = 1 "
+                "WHERE hbnb_number = ?",
+                (original_hbnb_id,),
+            )
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error("Error creating duplicate record: %s", e)
+            return False
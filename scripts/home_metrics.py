@@ -0,0 +1,497 @@
+"""Home-page summary metrics over the flight database.
+
+Builds the aggregate view used by the home page, answers the
+summary/debug queries, and extracts the J/Y CNF capacities from the
+latest SY command.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from scripts.hbpr_info_processor import find_database
+
+_RE_CNF = re.compile(r"CNF\s*/?\s*J\s*(\d+)\s*Y\s*(\d+)")
+
+# Bump whenever the view SQL below changes so existing databases get the
+# new definition exactly once.
+_VIEW_VERSION = 7
+
+# Summaries memoized per (db_file, mtime): UI reruns on an unchanged
+# database cost a stat() instead of any SQLite work.
+_SUMMARY_CACHE = {}
+_DEBUG_CACHE = {}
+
+# Databases whose view DDL has been verified this process; lets repeat
+# renders skip even the sqlite_master/user_version probes.
+_VIEWS_READY = set()
+
+# Parsed columns the summary view and its indexes aggregate over; they
+# only exist once HbprDatabase._add_chbpr_fields has run.
+_SUMMARY_COLUMNS = {
+    "class", "boarding_number", "has_infant",
+    "is_sa", "is_xres", "is_inad",
+}
+
+
+def invalidate_home_summary(db_file=None):
+    """Drop the cached summaries, optionally for one database only.
+
+    Also forgets that the database's views were verified, so the next
+    render re-probes (and rebuilds) them -- needed after schema-level
+    changes such as erasing the parsed columns.
+    """
+    if db_file is None:
+        _SUMMARY_CACHE.clear()
+        _DEBUG_CACHE.clear()
+        _VIEWS_READY.clear()
+        return
+    _VIEWS_READY.discard(db_file)
+    for cache in (_SUMMARY_CACHE, _DEBUG_CACHE):
+        for key in [k for k in cache if k[0] == db_file]:
+            del cache[key]
+
+
+def _connect(db_file):
+    """Open a connection with the standard settings.
+
+    WAL with relaxed sync suits this mostly-read workload, and the
+    cache/mmap sizes let the summary scans run from mapped memory; the
+    PRAGMAs are per-connection so they are applied on every open.
+    """
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+_POOL = {}
+_POOL_LOCK = threading.Lock()
+
+
+@contextmanager
+def _borrow(db_file):
+    """Check a pooled connection out for one call and return it after.
+
+    One connection is kept per database file so repeat UI polls skip
+    the open + PRAGMA round-trips; the lock serialises checkout.
+    """
+    with _POOL_LOCK:
+        conn = _POOL.pop(db_file, None)
+    if conn is None:
+        conn = _connect(db_file)
+    try:
+        yield conn
+    except Exception:
+        conn.close()
+        raise
+    with _POOL_LOCK:
+        if db_file not in _POOL:
+            _POOL[db_file] = conn
+        else:
+            conn.close()
+
+
+def create_or_refresh_views(db_file, conn=None, force=False):
+    """(Re)create the combined home-page aggregate view.
+
+    Reuses `conn` when the caller already holds one open; `force`
+    rebuilds even when the definitions look current.
+    """
+    if db_file in _VIEWS_READY and not force:
+        return
+    own_conn = conn is None
+    if own_conn:
+        conn = _connect(db_file)
+    try:
+        cursor = conn.cursor()
+        # The view, indexes and backfill all reference the parsed CHbpr
+        # columns; a freshly imported database only has the core record
+        # columns until validation runs, so there is nothing to build
+        # yet (and the DDL would fail on the missing columns).
+        cursor.execute("PRAGMA table_info(hbpr_full_records)")
+        columns = {row[1] for row in cursor}
+        if not _SUMMARY_COLUMNS <= columns:
+            return
+        # Views are metadata-only but DROP/CREATE takes a write lock and
+        # bumps the schema version; skip the whole refresh when the
+        # current definition is already in place.
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type='view' AND name='vw_home_summary'"
+        )
+        if cursor.fetchone() and not force:
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] == _VIEW_VERSION:
+                _VIEWS_READY.add(db_file)
+                return
+        cursor.execute("DROP VIEW IF EXISTS vw_home_accepted_counts")
+        cursor.execute("DROP VIEW IF EXISTS vw_home_flags")
+        cursor.execute("DROP VIEW IF EXISTS vw_home_summary")
+        cursor.execute(
+            """
+            CREATE VIEW vw_home_summary AS
+            WITH r AS (
+                SELECT
+                    class,
+                    (boarding_number IS NOT NULL
+                     AND boarding_number > 0) AS accepted,
+                    has_infant IS 1 AS infant,
+                    is_sa IS 1 AS sa,
+                    is_xres IS 1 AS xres,
+                    is_inad IS 1 AS inad
+                FROM hbpr_full_records
+            )
+            SELECT
+                COUNT(*) FILTER (WHERE accepted) AS total_accepted,
+                COUNT(*) FILTER (WHERE accepted AND infant)
+                    AS infant_count,
+                COUNT(*) FILTER (WHERE accepted AND class IN ('F', 'C'))
+                    AS accepted_business,
+                COUNT(*) FILTER (WHERE accepted AND class = 'Y')
+                    AS accepted_economy,
+                COUNT(*) FILTER (WHERE sa AND class IN ('F', 'C'))
+                    AS id_j,
+                COUNT(*) FILTER (WHERE sa AND class = 'Y') AS id_y,
+                COUNT(*) FILTER (WHERE xres AND NOT accepted
+                    AND class IN ('F', 'C')) AS noshow_j,
+                COUNT(*) FILTER (WHERE xres AND NOT accepted
+                    AND class = 'Y') AS noshow_y,
+                COUNT(*) FILTER (WHERE inad) AS inad_total
+            FROM r
+            """
+        )
+        # Covering index so the summary aggregates can be served from an
+        # index-only scan instead of the wide record rows; the duplicate
+        # index backs the records-page LEFT JOIN.
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_full_home_cover "
+            "ON hbpr_full_records(class, boarding_number, has_infant, "
+            "is_sa, is_xres, is_inad)"
+        )
+        # Partial indexes keep the rare-flag counts to a scan over just
+        # the flagged rows.
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_full_sa "
+            "ON hbpr_full_records(class) WHERE is_sa IS 1"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_full_xres "
+            "ON hbpr_full_records(class) WHERE is_xres IS 1"
+        )
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type='table' AND name='duplicate_record'"
+        )
+        if cursor.fetchone():
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_dup_original "
+                "ON duplicate_record(original_hbnb_id, created_at)"
+            )
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type='table' AND name='commands'"
+        )
+        if cursor.fetchone():
+            # Lets the SY LIMIT 1 lookup seek straight to the newest
+            # matching command instead of scanning and sorting.
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cmd_sy_latest "
+                "ON commands(command_type, is_latest, flight_number, "
+                "flight_date, updated_at DESC, id DESC)"
+            )
+        # Quasi-materialized summary: triggers on hbpr_full_records only
+        # mark the single counts row dirty; the expensive aggregate runs
+        # again only after the data actually changed.
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mv_home_counts (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total_accepted INTEGER,
+                infant_count INTEGER,
+                accepted_business INTEGER,
+                accepted_economy INTEGER,
+                id_j INTEGER,
+                id_y INTEGER,
+                noshow_j INTEGER,
+                noshow_y INTEGER,
+                inad_total INTEGER,
+                dirty INTEGER DEFAULT 1
+            )
+            """
+        )
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_home_{event.lower()} "
+                f"AFTER {event} ON hbpr_full_records BEGIN "
+                "UPDATE mv_home_counts SET dirty = 1; END"
+            )
+        # One-time backfill for records parsed before the flag columns
+        # existed, so every aggregate can rely on the integers.
+        cursor.execute(
+            "UPDATE hbpr_full_records SET "
+            "is_sa = (INSTR(',' || IFNULL(properties, '') || ',', "
+            "',SA') > 0), "
+            "is_xres = (INSTR(',' || IFNULL(properties, '') || ',', "
+            "',XRES') > 0), "
+            "is_inad = (INSTR(',' || IFNULL(properties, '') || ',', "
+            "',INAD') > 0) WHERE is_sa IS NULL"
+        )
+        if "has_props" in columns:
+            cursor.execute(
+                "UPDATE hbpr_full_records SET has_props = "
+                "(LENGTH(TRIM(IFNULL(properties, ''))) > 0) "
+                "WHERE has_props IS NULL"
+            )
+        cursor.execute("ANALYZE")
+        cursor.execute(f"PRAGMA user_version = {_VIEW_VERSION}")
+        conn.commit()
+        _VIEWS_READY.add(db_file)
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def get_home_summary(db_file=None):
+    """Return the aggregate counters shown on the home page."""
+    db_file = db_file or find_database()
+    if not db_file:
+        return None
+    try:
+        cache_key = (db_file, os.path.getmtime(db_file))
+    except OSError:
+        cache_key = None
+    if cache_key in _SUMMARY_CACHE:
+        return _SUMMARY_CACHE[cache_key]
+    with _borrow(db_file) as conn:
+        create_or_refresh_views(db_file, conn=conn)
+        if db_file not in _VIEWS_READY:
+            # Parsed columns absent: the records have not been
+            # validated yet, so there is no summary to aggregate.
+            return None
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT total_accepted, infant_count, accepted_business, "
+            "accepted_economy, id_j, id_y, noshow_j, noshow_y, "
+            "inad_total, dirty FROM mv_home_counts WHERE id = 1"
+        )
+        row = cursor.fetchone()
+        if row is None or row["dirty"]:
+            cursor.execute(
+                "INSERT OR REPLACE INTO mv_home_counts "
+                "SELECT 1, total_accepted, infant_count, "
+                "accepted_business, accepted_economy, id_j, id_y, "
+                "noshow_j, noshow_y, inad_total, 0 FROM vw_home_summary"
+            )
+            conn.commit()
+            cursor.execute(
+                "SELECT total_accepted, infant_count, accepted_business, "
+                "accepted_economy, id_j, id_y, noshow_j, noshow_y, "
+                "inad_total, dirty FROM mv_home_counts WHERE id = 1"
+            )
+            row = cursor.fetchone()
+        compartments = get_sy_compartments(db_file, conn=conn)
+    # COUNT(*) FILTER never yields NULL, so the counters arrive as ints
+    # straight from the integer columns -- no defensive coercion needed.
+    # Named access keeps the dict honest if the column order ever moves.
+    summary = {
+        "total_accepted": row["total_accepted"],
+        "infant_count": row["infant_count"],
+        "accepted_business": row["accepted_business"],
+        "accepted_economy": row["accepted_economy"],
+        "id_j": row["id_j"],
+        "id_y": row["id_y"],
+        "noshow_j": row["noshow_j"],
+        "noshow_y": row["noshow_y"],
+        "inad_total": row["inad_total"],
+    }
+    if compartments:
+        summary["sy_j_cnf"], summary["sy_y_cnf"] = compartments
+    if cache_key is not None:
+        try:
+            # Re-stat: the refresh above may itself have touched the file.
+            cache_key = (db_file, os.path.getmtime(db_file))
+        except OSError:
+            pass
+        _SUMMARY_CACHE[cache_key] = summary
+    return summary
+
+
+def _parse_cnf_from_text(text):
+    """Extract the (J, Y) CNF capacities from SY command text.
+
+    A hand-rolled scan over ``CNF[/ ]J<digits>Y<digits>`` beats the
+    regex engine on the large SY bodies; _RE_CNF remains the fallback
+    for any spacing the scan does not cover.
+    """
+    if not text:
+        return None
+    idx = text.find("CNF")
+    while idx >= 0:
+        pos = idx + 3
+        length = len(text)
+        while pos < length and text[pos] in " /":
+            pos += 1
+        if pos < length and text[pos] in "Jj":
+            pos += 1
+            while pos < length and text[pos] == " ":
+                pos += 1
+            j_start = pos
+            while pos < length and text[pos].isdigit():
+                pos += 1
+            if pos > j_start:
+                j_value = int(text[j_start:pos])
+                while pos < length and text[pos] == " ":
+                    pos += 1
+                if pos < length and text[pos] in "Yy":
+                    pos += 1
+                    while pos < length and text[pos] == " ":
+                        pos += 1
+                    y_start = pos
+                    while pos < length and text[pos].isdigit():
+                        pos += 1
+                    if pos > y_start:
+                        return j_value, int(text[y_start:pos])
+        idx = text.find("CNF", idx + 3)
+    match = _RE_CNF.search(text)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def _ensure_cnf_columns(cursor):
+    """Add j_cnf/y_cnf on `commands` and parse any unparsed SY rows.
+
+    Ingest fills the columns for new imports; this pass covers rows
+    written before the columns existed or whose content changed since.
+    Only rows WHERE j_cnf IS NULL are re-parsed, so the text scan
+    stays off the render path once everything is populated.
+    """
+    cursor.execute("PRAGMA table_info(commands)")
+    if not any(row[1] == "j_cnf" for row in cursor):
+        cursor.execute("ALTER TABLE commands ADD COLUMN j_cnf INTEGER")
+        cursor.execute("ALTER TABLE commands ADD COLUMN y_cnf INTEGER")
+    cursor.execute(
+        "SELECT id, command_full, content FROM commands "
+        "WHERE command_type = 'SY' AND j_cnf IS NULL"
+    )
+    updates = []
+    for row_id, command_full, content in cursor.fetchall():
+        parsed = (_parse_cnf_from_text(command_full)
+                  or _parse_cnf_from_text(content))
+        if parsed:
+            updates.append((parsed[0], parsed[1], row_id))
+    if updates:
+        cursor.executemany(
+            "UPDATE commands SET j_cnf = ?, y_cnf = ? WHERE id = ?",
+            updates,
+        )
+
+
+def get_sy_compartments(db_file, conn=None):
+    """Return (J, Y) capacities from the latest SY command, if any.
+
+    Reuses `conn` when the caller already holds one open.
+    """
+    if conn is None:
+        with _borrow(db_file) as pooled:
+            return get_sy_compartments(db_file, conn=pooled)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT name FROM sqlite_master "
+        "WHERE type='table' AND name='commands'"
+    )
+    if not cursor.fetchone():
+        return None
+    _ensure_cnf_columns(cursor)
+    conn.commit()
+    # Correlated subqueries fold the flight_info lookup into the same
+    # statement, saving a prepare/step round-trip per render.
+    cursor.execute(
+        "SELECT j_cnf, y_cnf FROM commands "
+        "WHERE command_type = 'SY' AND is_latest = 1 "
+        "AND flight_number = "
+        "(SELECT flight_number FROM flight_info LIMIT 1) "
+        "AND flight_date = "
+        "(SELECT flight_date FROM flight_info LIMIT 1) "
+        "AND j_cnf IS NOT NULL "
+        "ORDER BY updated_at DESC, id DESC LIMIT 1"
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return row["j_cnf"], row["y_cnf"]
+
+
+def get_debug_data(db_file=None):
+    """Return the per-class breakdowns shown on the debug expander."""
+    db_file = db_file or find_database()
+    if not db_file:
+        return None
+    with _borrow(db_file) as conn:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(hbpr_full_records)")
+        columns = {row[1] for row in cursor}
+        if not (_SUMMARY_COLUMNS | {"has_props"}) <= columns:
+            return None
+        # One grouped scan replaces the four separate aggregate queries;
+        # the per-class counters are split apart below.
+        cursor.execute(
+            "SELECT class, COUNT(*), "
+            "COUNT(*) FILTER (WHERE boarding_number > 0), "
+            "COUNT(*) FILTER (WHERE is_xres IS 1), "
+            "COUNT(*) FILTER (WHERE is_sa IS 1), "
+            "COUNT(*) FILTER (WHERE has_props IS NOT 1) "
+            "FROM hbpr_full_records GROUP BY class"
+        )
+        class_breakdown = {}
+        xres_counts = {}
+        sa_counts = {}
+        empty_properties = 0
+        for cls, total, accepted, xres, sa, empty in cursor:
+            class_breakdown[cls] = {"total": total, "accepted": accepted}
+            if xres:
+                xres_counts[cls] = xres
+            if sa:
+                sa_counts[cls] = sa
+            empty_properties += empty
+    return {
+        "class_breakdown": class_breakdown,
+        "xres_counts": xres_counts,
+        "sa_counts": sa_counts,
+        "empty_properties": empty_properties,
+    }
+
+
+def get_debug_summary(db_file=None):
+    """Return a flat summary of the debug counters."""
+    db_file = db_file or find_database()
+    try:
+        cache_key = (db_file, os.path.getmtime(db_file)) if db_file else None
+    except OSError:
+        cache_key = None
+    if cache_key in _DEBUG_CACHE:
+        return _DEBUG_CACHE[cache_key]
+    data = get_debug_data(db_file)
+    if not data:
+        return None
+    summary = {
+        "classes": sorted(data["class_breakdown"]),
+        "total_records": sum(
+            v["total"] for v in data["class_breakdown"].values()
+        ),
+        "xres_total": sum(data["xres_counts"].values()),
+        "sa_total": sum(data["sa_counts"].values()),
+        "empty_properties": data["empty_properties"],
+    }
+    if cache_key is not None:
+        _DEBUG_CACHE[cache_key] = summary
+    return summary
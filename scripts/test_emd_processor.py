@@ -0,0 +1,112 @@
+"""Standalone checks for the EMD processor.
+
+Run directly: ``python scripts/test_emd_processor.py``.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.emd_processor import (
+    create_api_data,
+    convert_record,
+    validate_emd_record,
+)
+
+# One frozen prototype shared by every test; cases copy it and override
+# only the fields under test instead of re-building the 16-key literal
+# per call.
+_BASE_RECORD = {
+    "emd": "9991234567890",
+    "name": "ZHANG/SAN",
+    "hbnb": "1",
+    "flight_number": "CA1234",
+    "flight_date": "27AUG",
+    "board": "PEK",
+    "off": "LAX",
+    "bag_pieces": "2",
+    "bag_weight": "46",
+    "rate": "50",
+    "ax": "100.00",
+    "currency": "CNY",
+    "payment": "CASH",
+    "last_4_digit": "",
+    "agent": "12345",
+    "remark": "",
+}
+
+_BASE_DATA = {
+    "total_amount": "100.00",
+    "report_date": "2026-08-27",
+    "signature": "OPS",
+    "collection_msg": "",
+}
+
+
+def test_validation():
+    # Output is accumulated and written once per test: one stdout lock
+    # and one flush instead of a syscall per line.
+    buf = ["== validate_emd_record ==\n"]
+    ok = validate_emd_record(dict(_BASE_RECORD))
+    buf.append(f"base record errors: {ok}\n")
+    assert ok == []
+    bad_emd = validate_emd_record({**_BASE_RECORD, "emd": "12345"})
+    buf.append(f"short emd errors: {bad_emd}\n")
+    assert bad_emd
+    bad_card = validate_emd_record(
+        {**_BASE_RECORD, "payment": "CC", "ax": 12345.00,
+         "last_4_digit": ""}
+    )
+    buf.append(f"card without last four: {bad_card}\n")
+    assert bad_card
+    bad_amount = validate_emd_record({**_BASE_RECORD, "ax": "-1"})
+    buf.append(f"negative amount: {bad_amount}\n")
+    assert bad_amount
+    buf.append("validation OK\n")
+    sys.stdout.write("".join(buf))
+
+
+def test_data_conversion():
+    buf = ["== convert_record ==\n"]
+    converted = convert_record(
+        {**_BASE_RECORD, "name": " zhang/san ", "ax": "100.005"}
+    )
+    buf.append(f"converted: {converted}\n")
+    assert converted["name"] == "ZHANG/SAN"
+    assert converted["ax"] == 100.0
+    assert converted["bag_pieces"] == 2
+    assert converted["bag_weight"] == 46
+    buf.append("conversion OK\n")
+    sys.stdout.write("".join(buf))
+
+
+def test_api_data_creation():
+    buf = ["== create_api_data ==\n"]
+    records = [
+        dict(_BASE_RECORD),
+        {**_BASE_RECORD, "emd": "9991234567891", "name": "LI/SI",
+         "payment": "CC", "last_4_digit": "4321"},
+    ]
+    data = create_api_data(records, **_BASE_DATA)
+    buf.append("\n".join(
+        f"  emd={entry['emd']} name={entry['name']} "
+        f"ax={entry['ax']} payment={entry['payment']}"
+        for entry in data["emd_list"]
+    ) + "\n")
+    assert data["total_amount"] == 100.0
+    assert len(data["emd_list"]) == 2
+    assert data["report_date"] == _BASE_DATA["report_date"]
+    buf.append("api data OK\n")
+    sys.stdout.write("".join(buf))
+
+
+def main():
+    test_validation()
+    test_data_conversion()
+    test_api_data_creation()
+    sys.stdout.write("All EMD tests passed\n")
+
+
+if __name__ == "__main__":
+    main()
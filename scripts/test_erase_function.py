@@ -0,0 +1,66 @@
+"""Standalone check for erase_all_records_except_core.
+
+Run directly: ``python scripts/test_erase_function.py``.
+"""
+
+import itertools
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.hbpr_database import HbprDatabase
+
+_TEST_DATA = [
+    (1, ">HBPR: CA1234,1\nZHANG/SAN", 0, 1, 1, "ZHANG/SAN", "Y"),
+    (2, ">HBPR: CA1234,2\nLI/SI", 0, 1, 1, "LI/SI", "Y"),
+    (3, ">HBPR: CA1234,3\nWANG/WU", 0, 1, 0, "WANG/WU", "C"),
+]
+
+
+def test_erase_function():
+    # The whole test lives in one in-memory database: no file opens, no
+    # journaling, no cleanup -- just SQL-execution cost.
+    conn = sqlite3.connect(":memory:")
+    db = HbprDatabase(connection=conn)
+    db._add_chbpr_fields()
+    # One multi-row INSERT inside one transaction: a single bind +
+    # step instead of per-row statements.
+    with conn:
+        conn.execute(
+            "INSERT INTO hbpr_full_records "
+            "(hbnb_number, record_content, bol_duplicate, "
+            "is_validated, is_valid, name, class) VALUES "
+            + ",".join(["(?,?,?,?,?,?,?)"] * len(_TEST_DATA)),
+            list(itertools.chain.from_iterable(_TEST_DATA)),
+        )
+    before = conn.execute(
+        "SELECT COUNT(*), COUNT(name) FROM hbpr_full_records"
+    ).fetchone()
+    print(f"before erase: {before[0]} records, {before[1]} parsed")
+    assert tuple(before) == (3, 3)
+    assert db.erase_all_records_except_core() is True
+    after = conn.execute(
+        "SELECT COUNT(*), COUNT(name), SUM(is_validated) "
+        "FROM hbpr_full_records"
+    ).fetchone()
+    print(f"after erase: {after[0]} records, {after[1]} parsed, "
+          f"{after[2]} validated")
+    assert tuple(after) == (3, 0, 0)
+    content = conn.execute(
+        "SELECT record_content FROM hbpr_full_records "
+        "WHERE hbnb_number = 1"
+    ).fetchone()
+    assert content[0] == _TEST_DATA[0][1]
+    print("erase kept the core columns intact")
+    db.close()
+
+
+def main():
+    test_erase_function()
+    print("Erase test passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Tray launcher for the FlightCheckPy Streamlit UI.
+
+Starts the Streamlit server in the background, waits until it answers
+on its health endpoint, then parks a system-tray icon with open/exit
+actions and Windows toast notifications for lifecycle events.
+"""
+
+import functools
+import http.client
+import logging
+import os
+import subprocess
+import sys
+import time
+import webbrowser
+
+import pystray
+
+logger = logging.getLogger(__name__)
+
+APP_HOST = "localhost"
+APP_PORT = 8501
+APP_URL = f"http://{APP_HOST}:{APP_PORT}"
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+streamlit_process = None
+
+
+def get_resource_path(relative_path):
+    """Resolve a bundled resource both from source and frozen builds."""
+    base_path = getattr(
+        sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__))
+    )
+    return os.path.join(base_path, relative_path)
+
+
+# Resolved once: every toast and tray rebuild reuses the same path
+# instead of re-stat()ing the .ico file.
+_ICON_PATH = get_resource_path("resources/fcp.ico")
+if not os.path.exists(_ICON_PATH):
+    _ICON_PATH = None
+
+# Decoded tray image, populated on first build_tray call.
+_ICON_IMAGE = None
+
+
+@functools.lru_cache(maxsize=1)
+def get_python_executable():
+    """Find the interpreter to launch Streamlit with.
+
+    Prefers a project virtualenv next to this script so the launcher
+    works from a plain checkout; falls back to the running interpreter.
+    The result cannot change within a session, so the filesystem probes
+    run at most once.
+    """
+    venv_dirs = ["venv", ".venv", "env", ".env"]
+    for venv_dir in venv_dirs:
+        for exe_name in ["pythonw.exe", "python.exe"]:
+            candidate = os.path.join(
+                _SCRIPT_DIR, venv_dir, "Scripts", exe_name
+            )
+            if os.path.exists(candidate):
+                logger.debug("Using interpreter: %s", candidate)
+                return candidate
+        candidate = os.path.join(_SCRIPT_DIR, venv_dir, "bin", "python")
+        if os.path.exists(candidate):
+            logger.debug("Using interpreter: %s", candidate)
+            return candidate
+    logger.debug("No virtualenv found, using %s", sys.executable)
+    return sys.executable
+
+
+def wait_for_streamlit(timeout=30.0):
+    """Poll the Streamlit health endpoint until it answers.
+
+    One persistent HTTP connection is reused across polls -- no fresh
+    socket per attempt -- and the backoff starts at 50 ms so a fast
+    server start is detected in tens of milliseconds instead of the
+    old fixed one-second sleep.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    conn = http.client.HTTPConnection(APP_HOST, APP_PORT, timeout=0.5)
+    try:
+        while time.monotonic() < deadline:
+            try:
+                conn.request("GET", "/_stcore/health")
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    return True
+            except OSError:
+                # Server not up yet (or dropped the keep-alive); start
+                # a clean connection for the next attempt.
+                conn.close()
+                conn = http.client.HTTPConnection(
+                    APP_HOST, APP_PORT, timeout=0.5
+                )
+            time.sleep(delay)
+            delay = min(delay * 1.5, 0.5)
+    finally:
+        conn.close()
+    return False
+
+
+def notify_winotify(title, message):
+    """Show a Windows toast; quietly do nothing where unsupported.
+
+    winotify is imported here rather than at module level: it drags in
+    a large Windows-API surface that would otherwise delay the tray
+    icon appearing, and the first toast only happens after startup.
+    """
+    try:
+        from winotify import Notification, audio
+
+        toast = Notification(
+            app_id="FlightCheckPy",
+            title=title,
+            msg=message,
+            icon=_ICON_PATH or "",
+        )
+        toast.set_audio(audio.Default, loop=False)
+        toast.show()
+    except Exception as e:
+        print(f"Notification failed: {e}")
+
+
+def start_streamlit():
+    """Launch the Streamlit server as a background child process."""
+    global streamlit_process
+    python_exe = get_python_executable()
+    streamlit_process = subprocess.Popen(
+        [
+            python_exe, "-m", "streamlit", "run",
+            os.path.join("ui", "main.py"),
+            "--server.port", str(APP_PORT),
+            "--server.headless", "true",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=_SCRIPT_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    if wait_for_streamlit():
+        notify_winotify("FlightCheckPy", f"服务已启动: {APP_URL}")
+        return True
+    notify_winotify("FlightCheckPy", "服务启动超时，请检查日志。")
+    return False
+
+
+def stop_streamlit(icon=None, item=None):
+    """Terminate the Streamlit child and dismiss the tray icon."""
+    global streamlit_process
+    if streamlit_process is not None:
+        streamlit_process.terminate()
+        try:
+            streamlit_process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            streamlit_process.kill()
+        streamlit_process = None
+    if icon is not None:
+        icon.stop()
+
+
+def open_in_browser(icon=None, item=None):
+    """Open the running UI in the default browser."""
+    webbrowser.open(APP_URL)
+
+
+def build_tray():
+    """Build the tray icon with its open/exit menu.
+
+    PIL is only needed once the server is already up, so it is
+    imported lazily to keep it off the launcher's cold-start path; the
+    decoded image is kept so rebuilds never re-read the .ico.
+    """
+    global _ICON_IMAGE
+    if _ICON_IMAGE is None:
+        from PIL import Image
+
+        if _ICON_PATH:
+            _ICON_IMAGE = Image.open(_ICON_PATH)
+            _ICON_IMAGE.load()
+        else:
+            _ICON_IMAGE = Image.new("RGB", (64, 64), color=(30, 90, 160))
+    menu = pystray.Menu(
+        pystray.MenuItem(
+            "打开界面", open_in_browser, default=True
+        ),
+        pystray.MenuItem("退出", stop_streamlit),
+    )
+    return pystray.Icon(
+        "FlightCheckPy", _ICON_IMAGE, "FlightCheckPy", menu
+    )
+
+
+def main():
+    if not start_streamlit():
+        return
+    open_in_browser()
+    tray = build_tray()
+    tray.run()
+    stop_streamlit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""其他指令 page: import, browse and edit terminal command texts."""
+
+import io
+import os
+import re
+import sys
+
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__)))))
+
+from scripts.command_processor import CommandProcessor
+
+# Header line of one command block, e.g. ">SY:CA1234/27AUG ...".
+_CMD_HEADER_RE = re.compile(
+    r">\s*([A-Z]{2,4})\s*[:\s]\s*([A-Z]{2}\d{1,4})?\s*/?\s*"
+    r"(\d{1,2}[A-Z]{3})?"
+)
+
+# Streamlit reruns the whole page per widget click; keying on the
+# database mtime serves unchanged data from memory and naturally
+# invalidates after any store/edit/clear.
+@st.cache_data(show_spinner=False)
+def _load_commands(db_file, mtime):
+    processor = CommandProcessor(db_file)
+    try:
+        return processor.get_all_commands_data()
+    finally:
+        processor.close()
+
+
+@st.cache_data(show_spinner=False)
+def _load_command_types(db_file, mtime):
+    processor = CommandProcessor(db_file)
+    try:
+        return processor.get_command_types()
+    finally:
+        processor.close()
+
+
+@st.cache_data(show_spinner=False)
+def _load_commands_by_types(db_file, mtime, types):
+    processor = CommandProcessor(db_file)
+    try:
+        return processor.get_commands_by_types(list(types))
+    finally:
+        processor.close()
+
+
+def _db_mtime(db_file):
+    try:
+        return os.path.getmtime(db_file)
+    except OSError:
+        return 0.0
+
+
+def _invalidate_command_caches():
+    _load_commands.clear()
+    _load_commands_by_types.clear()
+    _load_command_types.clear()
+
+
+def parse_commands_from_text(processor, content):
+    """Parse command text into command tuples.
+
+    Returns a list of (command_full, flight_number, flight_date,
+    command_type, content) tuples in table column order, ready for
+    `store_commands`.
+    """
+    commands = []
+    header = None
+    body = []
+    for line in content.split("\n"):
+        match = _CMD_HEADER_RE.match(line)
+        if match:
+            if header is not None:
+                commands.append(header + ("\n".join(body),))
+            body = []
+            header = (
+                line.strip(),
+                match.group(2) or "",
+                match.group(3) or "",
+                match.group(1),
+            )
+        elif header is not None:
+            body.append(line)
+    if header is not None:
+        commands.append(header + ("\n".join(body),))
+    return commands
+
+
+def show_import_commands(processor):
+    """Upload a command text file and store its commands."""
+    uploaded_file = st.file_uploader(
+        "选择指令文本文件", type=["txt"], key="commands_upload"
+    )
+    if uploaded_file is None:
+        return
+    # Decode straight from the in-memory upload: no temp file written,
+    # re-read or cleaned up.
+    content = uploaded_file.getvalue().decode(
+        "utf-8", errors="replace"
+    )
+    st.session_state["upload_content"] = content
+    with st.expander("文件预览（前50行）"):
+        # Scan to the 50th newline and slice once; split() with a
+        # maxsplit would still copy the whole remainder of a large
+        # upload into its last element.
+        end = -1
+        for _ in range(50):
+            end = content.find("\n", end + 1)
+            if end == -1:
+                break
+        st.code(content if end == -1 else content[:end])
+    matching_commands = parse_commands_from_text(processor, content)
+    st.info(f"解析到 {len(matching_commands)} 条指令")
+    if st.button("存储指令", key="store_commands"):
+        new_count, updated_count = processor.store_commands(
+            matching_commands
+        )
+        _invalidate_command_caches()
+        st.success(f"新增 {new_count} 条，更新 {updated_count} 条")
+
+
+def show_view_data(processor):
+    """Browse stored commands filtered by type."""
+    mtime = _db_mtime(processor.db_file)
+    command_types = _load_command_types(processor.db_file, mtime)
+    if not command_types:
+        st.info("尚无指令数据，请先导入。")
+        return
+    selected_commands = st.multiselect(
+        "指令类型", command_types, default=command_types
+    )
+    if not selected_commands:
+        return
+    # The type filter runs in SQL, so unselected rows never cross the
+    # sqlite3 boundary; one DataFrame is built from exactly the rows
+    # shown.
+    commands_data = _load_commands_by_types(
+        processor.db_file, mtime, tuple(selected_commands)
+    )
+    display_df = pd.DataFrame(commands_data)
+    # Both columns repeat a handful of values; categorical codes shrink
+    # them for display.
+    display_df["command_type"] = (
+        display_df["command_type"].astype("category")
+    )
+    display_df["flight_number"] = (
+        display_df["flight_number"].astype("category")
+    )
+    # SQLite emits CURRENT_TIMESTAMP in one fixed shape; naming it
+    # keeps to_datetime on the C fast path instead of inferring the
+    # format per value.
+    for col in ("created_at", "updated_at"):
+        display_df[col] = pd.to_datetime(
+            display_df[col], format="%Y-%m-%d %H:%M:%S",
+            errors="coerce",
+        ).dt.strftime("%Y-%m-%d %H:%M")
+    st.dataframe(display_df, use_container_width=True)
+    output = io.BytesIO()
+    # constant_memory streams rows straight into the zip, so the
+    # export holds one row in memory instead of the whole worksheet
+    # as openpyxl cell objects.
+    with pd.ExcelWriter(
+        output, engine="xlsxwriter",
+        engine_kwargs={"options": {"constant_memory": True}},
+    ) as writer:
+        display_df.to_excel(writer, index=False, sheet_name="commands")
+    st.download_button(
+        "导出 Excel", data=output.getvalue(),
+        file_name="commands.xlsx",
+        mime=("application/vnd.openxmlformats-officedocument"
+              ".spreadsheetml.sheet"),
+    )
+
+
+def show_edit_data(processor):
+    """Edit the body of one stored command."""
+    commands_data = _load_commands(
+        processor.db_file, _db_mtime(processor.db_file)
+    )
+    if not commands_data:
+        st.info("尚无指令数据，请先导入。")
+        return
+    # command_full is unique, so a dict gives the selected record in
+    # O(1) -- no DataFrame and no per-rerun linear mask scan.
+    by_cmd = {c["command_full"]: c for c in commands_data}
+    selected_command = st.selectbox("选择指令", list(by_cmd))
+    record = by_cmd[selected_command]
+    content = st.text_area(
+        "指令内容", value=record["content"], height=300
+    )
+    if st.button("保存修改", key="save_command"):
+        if processor.save_edited_data(selected_command, content):
+            _invalidate_command_caches()
+            st.success("已保存")
+        else:
+            st.error("保存失败")
+
+
+def show_command_settings(processor):
+    """Per-type counts and maintenance actions."""
+    commands_data = _load_commands(
+        processor.db_file, _db_mtime(processor.db_file)
+    )
+    counts = {}
+    for cmd in commands_data:
+        key = cmd.get("command_type", "")
+        counts[key] = counts.get(key, 0) + 1
+    if counts:
+        st.table(pd.DataFrame(
+            sorted(counts.items()), columns=["指令类型", "数量"]
+        ))
+    else:
+        st.info("尚无指令数据。")
+    if st.button("清空全部指令", key="clear_commands"):
+        if processor.clear_all_commands():
+            _invalidate_command_caches()
+            st.success("已清空")
+            st.rerun()
+
+
+def main():
+    st.title("其他指令")
+    processor = CommandProcessor()
+    if not processor.db_file:
+        st.warning("未找到航班数据库，请先在主页导入 HBPR 数据。")
+        return
+    tab_import, tab_view, tab_edit, tab_settings = st.tabs(
+        ["导入", "查看", "编辑", "设置"]
+    )
+    with tab_import:
+        show_import_commands(processor)
+    with tab_view:
+        show_view_data(processor)
+    with tab_edit:
+        show_edit_data(processor)
+    with tab_settings:
+        show_command_settings(processor)
+
+
+main()